@@ -5,10 +5,109 @@ Wrapper for the Attention REST API (https://api.attention.tech/v2/)
 Documentation: https://docs.attention.com/api-authentication
 """
 
+import asyncio
+import functools
+import hashlib
+import logging
 import os
+import sqlite3
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, Union
+from urllib.parse import urlencode
 import httpx
+import orjson
+from diskcache import Cache
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth retrying before surfacing the error
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+RETRY_ATTEMPTS = 4
+# Longest Retry-After we are willing to sleep for, in seconds
+MAX_RETRY_AFTER = 10.0
+
+_backoff = wait_exponential_jitter(initial=0.2, max=4)
+
+
+@functools.lru_cache(maxsize=32)
+def _date_range(days_back: int, bucket: int) -> tuple[str, str]:
+    """
+    Compute the (from_date, to_date) pair covering the past N days.
+
+    Args:
+        days_back: Number of days to look back
+        bucket: Current minute (time.time() // 60). Only used as part of the
+            cache key, so cached ranges roll over once a minute.
+
+    Returns:
+        Tuple of YYYY-MM-DD date strings
+    """
+    now = datetime.now()
+    return (now - timedelta(days=days_back)).strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d")
+
+
+@functools.lru_cache(maxsize=128)
+def _build_url(path: str, params: tuple[tuple[str, object], ...]) -> str:
+    """
+    Build a request URL with its encoded query string.
+
+    Args:
+        path: Endpoint path relative to BASE_URL
+        params: Query parameters as (name, value) pairs
+
+    Returns:
+        Path with the query string appended
+    """
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Whether a failed request is worth retrying."""
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in RETRY_STATUS_CODES
+
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    """Wait for the server's Retry-After if it gave one in seconds, else back off with jitter."""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, httpx.HTTPStatusError):
+        retry_after = exc.response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), MAX_RETRY_AFTER)
+            except ValueError:
+                # HTTP-date form; fall back to exponential backoff
+                pass
+    return _backoff(retry_state)
+
+
+def _has_transcript(conversation: dict) -> bool:
+    """Whether a conversation response carries a transcript (i.e. transcription has finished)."""
+    attrs = conversation.get("attributes") or conversation.get("data", {}).get("attributes", {})
+    return bool(attrs.get("transcript"))
+
+
+class ConversationFetchError(Exception):
+    """A conversation in a bulk fetch could not be retrieved."""
+
+    def __init__(self, conversation_id: str, cause: Exception):
+        if isinstance(cause, httpx.HTTPStatusError):
+            reason = f"API error {cause.response.status_code}"
+        elif isinstance(cause, httpx.RequestError):
+            reason = f"Network error: {cause}"
+        else:
+            reason = str(cause) or type(cause).__name__
+        super().__init__(f"{conversation_id}: {reason}")
+        self.conversation_id = conversation_id
+        self.reason = reason
 
 
 class AttentionClient:
@@ -16,27 +115,191 @@ class AttentionClient:
 
     BASE_URL = "https://api.attention.tech/v2"
 
-    def __init__(self, api_key: Optional[str] = None):
+    # Transcribed conversations change rarely (intelligence and video status still
+    # settle afterwards), but search results change often
+    CONVERSATION_TTL = 3600.0
+    SEARCH_TTL = 30.0
+    CACHE_MAX_ENTRIES = 256
+
+    # Transcribed conversations are also kept on disk so they survive restarts,
+    # refreshed daily to pick up intelligence and status that arrive later
+    DEFAULT_CACHE_DIR = "~/.cache/attention-mcp"
+    DISK_CACHE_SIZE_LIMIT = 2 << 30
+    DISK_CACHE_TTL = 24 * CONVERSATION_TTL
+
+    # Upper bound on in-flight requests, matched to the keep-alive pool size
+    MAX_CONCURRENT_REQUESTS = 20
+
+    def __init__(self, api_key: Optional[str] = None, cache_dir: Optional[str] = None):
         """
         Initialize the Attention client.
 
         Args:
             api_key: Attention API key. If not provided, reads from ATTENTION_API_KEY env var.
+            cache_dir: Directory for the persistent conversation cache; "" disables it. If not
+                provided, reads from ATTENTION_CACHE_DIR env var, then falls back to
+                DEFAULT_CACHE_DIR. Setting ATTENTION_DISK_CACHE=0 also disables it.
         """
         self.api_key = api_key or os.environ.get("ATTENTION_API_KEY")
         if not self.api_key:
             raise ValueError("ATTENTION_API_KEY must be set")
 
-        self.client = httpx.Client(
+        self.client = httpx.AsyncClient(
             base_url=self.BASE_URL,
             headers={
                 "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json",
             },
             timeout=30.0,
+            # Concurrent requests multiplex over one connection (needs the h2 extra)
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=20,
+                keepalive_expiry=60.0,
+            ),
         )
 
-    def search_conversations(
+        # url -> (monotonic expiry time, response)
+        self._cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._disk_hits = 0
+        self._disk = self._open_disk_cache(cache_dir)
+        self._request_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+
+    def _open_disk_cache(self, cache_dir: Optional[str]) -> Optional[Cache]:
+        """
+        Open this credential's persistent conversation cache.
+
+        Args:
+            cache_dir: Base cache directory, "" to disable, or None to read the environment
+
+        Returns:
+            The cache, or None if it is disabled or can't be opened
+        """
+        if cache_dir is None:
+            if os.environ.get("ATTENTION_DISK_CACHE", "1").lower() in ("0", "false", "no", "off"):
+                return None
+            cache_dir = os.environ.get("ATTENTION_CACHE_DIR", self.DEFAULT_CACHE_DIR)
+        if not cache_dir:
+            return None
+
+        # One subdirectory per credential and API, so a shared cache dir never
+        # serves one account's conversations to another
+        scope = hashlib.sha256(f"{self.BASE_URL}\0{self.api_key}".encode()).hexdigest()[:32]
+        path = os.path.join(os.path.expanduser(cache_dir), scope)
+        try:
+            # Transcripts are private and loaded back with pickle, so only the owner
+            # may read or write them
+            os.makedirs(path, mode=0o700, exist_ok=True)
+            os.chmod(path, 0o700)
+            return Cache(path, size_limit=self.DISK_CACHE_SIZE_LIMIT)
+        except (OSError, sqlite3.Error) as e:
+            # Caching is an optimization; a read-only home shouldn't break the client
+            logger.warning(f"Disk cache disabled, could not open {path}: {e}")
+            return None
+
+    async def _get(
+        self,
+        path: str,
+        params: dict,
+        ttl: float,
+        is_final: Optional[Callable[[dict], bool]] = None,
+    ) -> dict:
+        """
+        GET a JSON resource, serving repeated requests from an in-memory TTL cache.
+
+        Args:
+            path: Endpoint path relative to BASE_URL
+            params: Query parameters
+            ttl: Seconds a cached response stays fresh in memory
+            is_final: If given, responses are also looked up in the disk cache. Fetched
+                responses for which it returns True are stored there for DISK_CACHE_TTL;
+                the rest may still change, so they are only kept in memory for SEARCH_TTL
+
+        Returns:
+            Decoded JSON response. The dict is shared with the cache and must not be mutated.
+        """
+        # The URL doubles as the cache key; params are built in a fixed order
+        url = _build_url(path, tuple(params.items()))
+        entry = self._cache.get(url)
+        if entry is not None:
+            expires_at, data = entry
+            if time.monotonic() < expires_at:
+                self._cache.move_to_end(url)
+                self._cache_hits += 1
+                return data
+            del self._cache[url]
+
+        # diskcache does blocking SQLite I/O and pickling, so keep it off the event loop
+        if is_final is not None and self._disk is not None:
+            data = await asyncio.to_thread(self._disk.get, url)
+            if data is not None:
+                self._disk_hits += 1
+                self._remember(url, data, ttl)
+                return data
+
+        self._cache_misses += 1
+        response = await self._fetch(url)
+        data = orjson.loads(response.content)
+
+        if is_final is None or is_final(data):
+            self._remember(url, data, ttl)
+            if is_final is not None and self._disk is not None:
+                await asyncio.to_thread(self._disk.set, url, data, expire=self.DISK_CACHE_TTL)
+        else:
+            self._remember(url, data, min(ttl, self.SEARCH_TTL))
+        return data
+
+    @retry(
+        retry=retry_if_exception(_is_transient),
+        stop=stop_after_attempt(RETRY_ATTEMPTS),
+        wait=_retry_wait,
+        reraise=True,
+    )
+    async def _fetch(self, url: str) -> httpx.Response:
+        """
+        GET a resource, retrying rate-limited and transient gateway errors.
+
+        Args:
+            url: Path relative to BASE_URL, including the query string
+
+        Returns:
+            The successful response
+
+        Raises:
+            httpx.HTTPStatusError: On a non-transient error, or once retries are exhausted
+        """
+        async with self._request_semaphore:
+            response = await self.client.get(url)
+        response.raise_for_status()
+        return response
+
+    def _remember(self, url: str, data: dict, ttl: float):
+        """Store a response in the in-memory cache for ttl seconds, evicting the least recently used."""
+        self._cache[url] = (time.monotonic() + ttl, data)
+        if len(self._cache) > self.CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
+    def get_cache_stats(self) -> dict:
+        """Return response cache hit/miss counters and current size."""
+        return {
+            "hits": self._cache_hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._cache_misses,
+            "size": len(self._cache),
+            "max_size": self.CACHE_MAX_ENTRIES,
+            "disk_size": len(self._disk) if self._disk is not None else 0,
+        }
+
+    def clear_cache(self):
+        """Drop all cached responses, including those persisted to disk."""
+        self._cache.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    async def search_conversations(
         self,
         query: Optional[str] = None,
         from_date: Optional[str] = None,
@@ -64,27 +327,23 @@ class AttentionClient:
             Dict with 'data' (list of conversations) and 'meta' (pagination info)
         """
         params = {
-            "page": page,
-            "size": size,
-            "detailedTranscript": str(detailed_transcript).lower(),
+            key: value
+            for key, value in (
+                ("page", page),
+                ("size", size),
+                ("detailedTranscript", "true" if detailed_transcript else "false"),
+                ("filter[title]", query or None),
+                ("fromDateTime", f"{from_date}T00:00:00Z" if from_date else None),
+                ("toDateTime", f"{to_date}T23:59:59Z" if to_date else None),
+                ("filter[participants.email]", participant_email or None),
+                ("filter[owner.email]", owner_email or None),
+            )
+            if value is not None
         }
 
-        if query:
-            params["filter[title]"] = query
-        if from_date:
-            params["fromDateTime"] = f"{from_date}T00:00:00Z"
-        if to_date:
-            params["toDateTime"] = f"{to_date}T23:59:59Z"
-        if participant_email:
-            params["filter[participants.email]"] = participant_email
-        if owner_email:
-            params["filter[owner.email]"] = owner_email
-
-        response = self.client.get("/conversations", params=params)
-        response.raise_for_status()
-        return response.json()
+        return await self._get("/conversations", params, ttl=self.SEARCH_TTL)
 
-    def get_conversation(
+    async def get_conversation(
         self,
         conversation_id: str,
         detailed_transcript: bool = True,
@@ -102,18 +361,56 @@ class AttentionClient:
             Conversation data with transcript
         """
         params = {
-            "detailedTranscript": str(detailed_transcript).lower(),
-            "filter[include_internal_participants]": str(include_internal_participants).lower(),
+            "detailedTranscript": "true" if detailed_transcript else "false",
+            "filter[include_internal_participants]": "true" if include_internal_participants else "false",
         }
 
-        response = self.client.get(f"/conversations/{conversation_id}", params=params)
-        response.raise_for_status()
-        return response.json()
+        return await self._get(
+            f"/conversations/{conversation_id}",
+            params,
+            ttl=self.CONVERSATION_TTL,
+            is_final=_has_transcript,
+        )
+
+    async def get_conversations_bulk(
+        self,
+        conversation_ids: list[str],
+        detailed_transcript: bool = True,
+    ) -> list[Union[dict, ConversationFetchError]]:
+        """
+        Get several conversations by ID, fetching them concurrently.
+
+        A failure for one ID doesn't fail the others; it is returned in that ID's place.
+
+        Args:
+            conversation_ids: The conversation UUIDs
+            detailed_transcript: Include detailed transcript info
 
-    def list_recent_conversations(
+        Returns:
+            List of conversation data or ConversationFetchError, in the same order as
+            conversation_ids
+        """
+        results = await asyncio.gather(
+            *(
+                self.get_conversation(conversation_id, detailed_transcript=detailed_transcript)
+                for conversation_id in conversation_ids
+            ),
+            return_exceptions=True,
+        )
+        for conversation_id, result in zip(conversation_ids, results):
+            # Cancellation and other BaseExceptions must still propagate
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result
+        return [
+            ConversationFetchError(conversation_id, result) if isinstance(result, Exception) else result
+            for conversation_id, result in zip(conversation_ids, results)
+        ]
+
+    async def list_recent_conversations(
         self,
         days_back: int = 7,
         size: int = 20,
+        detailed_transcript: bool = False,
     ) -> dict:
         """
         List recent conversations from the past N days.
@@ -121,25 +418,40 @@ class AttentionClient:
         Args:
             days_back: Number of days to look back
             size: Maximum number of results
+            detailed_transcript: Fetch full details and transcript for each conversation
 
         Returns:
-            Dict with 'data' (list of conversations) and 'meta' (pagination info)
+            Dict with 'data' (list of conversations) and 'meta' (pagination info).
+            With detailed_transcript, 'data' holds full conversation details instead
+            of search summaries, with a ConversationFetchError for any that failed.
         """
-        from_date = (datetime.now() - timedelta(days=days_back)).strftime("%Y-%m-%d")
-        to_date = datetime.now().strftime("%Y-%m-%d")
+        from_date, to_date = _date_range(days_back, int(time.time() // 60))
 
-        return self.search_conversations(
+        result = await self.search_conversations(
             from_date=from_date,
             to_date=to_date,
             size=size,
         )
+        if not detailed_transcript:
+            return result
+
+        conversation_ids = [
+            conversation_id
+            for conv in result.get("data", [])
+            if (conversation_id := conv.get("id") or conv.get("attributes", {}).get("uuid"))
+        ]
+        details = await self.get_conversations_bulk(conversation_ids)
+        # Copy rather than mutate: the search result is shared with the cache
+        return {**result, "data": details}
 
-    def close(self):
-        """Close the HTTP client."""
-        self.client.close()
+    async def aclose(self):
+        """Close the HTTP client and the disk cache."""
+        await self.client.aclose()
+        if self._disk is not None:
+            self._disk.close()
 
-    def __enter__(self):
+    async def __aenter__(self):
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
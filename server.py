@@ -6,16 +6,21 @@ Exposes Attention API for call transcript search and retrieval via MCP protocol.
 Documentation: https://docs.attention.com/api-authentication
 """
 
-import json
+import asyncio
+import io
+import itertools
 import logging
 from datetime import datetime
-from typing import Optional
+from operator import itemgetter
+from typing import Callable, Optional, Union
 
+import httpx
+import orjson
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
-from attention_client import AttentionClient
+from attention_client import AttentionClient, ConversationFetchError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,103 +31,149 @@ server = Server("attention")
 
 # Global client instance (initialized on first use)
 _client: Optional[AttentionClient] = None
+_client_lock = asyncio.Lock()
 
 
-def get_client() -> AttentionClient:
+async def get_client() -> AttentionClient:
     """Get or create the Attention client."""
     global _client
     if _client is None:
-        _client = AttentionClient()
+        async with _client_lock:
+            if _client is None:
+                _client = AttentionClient()
     return _client
 
 
-@server.list_tools()
-async def list_tools() -> list[Tool]:
-    """List available tools."""
-    return [
-        Tool(
-            name="search_conversations",
-            description="Search Attention for call recordings and transcripts. Use for sales calls, customer calls, and demos.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "Search term for conversation title (case-insensitive partial match)",
-                    },
-                    "from_date": {
-                        "type": "string",
-                        "description": "Start date in YYYY-MM-DD format",
-                    },
-                    "to_date": {
-                        "type": "string",
-                        "description": "End date in YYYY-MM-DD format",
-                    },
-                    "participant_email": {
-                        "type": "string",
-                        "description": "Filter by participant email address",
-                    },
-                    "owner_email": {
-                        "type": "string",
-                        "description": "Filter by call owner email address",
-                    },
-                    "size": {
-                        "type": "integer",
-                        "description": "Maximum number of results (default: 20)",
-                        "default": 20,
-                    },
+async def close_client():
+    """Close the Attention client, draining its connection pool."""
+    global _client
+    async with _client_lock:
+        if _client is not None:
+            await _client.aclose()
+            _client = None
+
+
+# Tool schemas are static, so build them once at import
+_TOOLS: list[Tool] = [
+    Tool(
+        name="search_conversations",
+        description="Search Attention for call recordings and transcripts. Use for sales calls, customer calls, and demos.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search term for conversation title (case-insensitive partial match)",
+                },
+                "from_date": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format",
+                },
+                "to_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format",
+                },
+                "participant_email": {
+                    "type": "string",
+                    "description": "Filter by participant email address",
+                },
+                "owner_email": {
+                    "type": "string",
+                    "description": "Filter by call owner email address",
+                },
+                "size": {
+                    "type": "integer",
+                    "description": "Maximum number of results (default: 20)",
+                    "default": 20,
                 },
             },
-        ),
-        Tool(
-            name="get_conversation",
-            description="Get full details and transcript for a specific Attention conversation by ID.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "conversation_id": {
-                        "type": "string",
-                        "description": "The conversation UUID",
-                    },
-                    "detailed_transcript": {
-                        "type": "boolean",
-                        "description": "Include detailed transcript with speaker labels (default: true)",
-                        "default": True,
-                    },
+        },
+    ),
+    Tool(
+        name="get_conversation",
+        description="Get full details and transcript for a specific Attention conversation by ID.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "conversation_id": {
+                    "type": "string",
+                    "description": "The conversation UUID",
+                },
+                "detailed_transcript": {
+                    "type": "boolean",
+                    "description": "Include detailed transcript with speaker labels (default: true)",
+                    "default": True,
                 },
-                "required": ["conversation_id"],
             },
-        ),
-        Tool(
-            name="list_recent_conversations",
-            description="List recent Attention conversations from the past N days.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "days_back": {
-                        "type": "integer",
-                        "description": "Number of days to look back (default: 7)",
-                        "default": 7,
-                    },
-                    "size": {
-                        "type": "integer",
-                        "description": "Maximum number of results (default: 20)",
-                        "default": 20,
-                    },
+            "required": ["conversation_id"],
+        },
+    ),
+    Tool(
+        name="get_conversations_bulk",
+        description="Get full details and transcripts for several Attention conversations by ID in one call.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "conversation_ids": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "The conversation UUIDs",
+                },
+                "detailed_transcript": {
+                    "type": "boolean",
+                    "description": "Include detailed transcript with speaker labels (default: true)",
+                    "default": True,
                 },
             },
-        ),
-    ]
+            "required": ["conversation_ids"],
+        },
+    ),
+    Tool(
+        name="list_recent_conversations",
+        description="List recent Attention conversations from the past N days.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "days_back": {
+                    "type": "integer",
+                    "description": "Number of days to look back (default: 7)",
+                    "default": 7,
+                },
+                "size": {
+                    "type": "integer",
+                    "description": "Maximum number of results (default: 20)",
+                    "default": 20,
+                },
+                "detailed_transcript": {
+                    "type": "boolean",
+                    "description": "Return full details and transcript for each conversation (default: false)",
+                    "default": False,
+                },
+            },
+        },
+    ),
+]
+
+
+@server.list_tools()
+async def list_tools() -> list[Tool]:
+    """List available tools."""
+    return _TOOLS
 
 
 @server.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
-    """Handle tool calls."""
+    """
+    Handle tool calls.
+
+    Formatting runs in a worker thread so a long transcript doesn't stall
+    other in-flight tool calls on the event loop.
+    """
     try:
-        client = get_client()
+        client = await get_client()
 
         if name == "search_conversations":
-            result = client.search_conversations(
+            result = await client.search_conversations(
                 query=arguments.get("query"),
                 from_date=arguments.get("from_date"),
                 to_date=arguments.get("to_date"),
@@ -130,28 +181,76 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                 owner_email=arguments.get("owner_email"),
                 size=arguments.get("size", 20),
             )
-            return [TextContent(type="text", text=format_search_results(result))]
+            return [TextContent(type="text", text=await asyncio.to_thread(format_search_results, result))]
 
         elif name == "get_conversation":
-            result = client.get_conversation(
+            result = await client.get_conversation(
                 conversation_id=arguments["conversation_id"],
                 detailed_transcript=arguments.get("detailed_transcript", True),
             )
-            return [TextContent(type="text", text=format_conversation(result))]
+            return [TextContent(type="text", text=await asyncio.to_thread(format_conversation, result))]
+
+        elif name == "get_conversations_bulk":
+            results = await client.get_conversations_bulk(
+                conversation_ids=arguments["conversation_ids"],
+                detailed_transcript=arguments.get("detailed_transcript", True),
+            )
+            return [TextContent(type="text", text=await asyncio.to_thread(format_conversations, results))]
 
         elif name == "list_recent_conversations":
-            result = client.list_recent_conversations(
+            detailed_transcript = arguments.get("detailed_transcript", False)
+            result = await client.list_recent_conversations(
                 days_back=arguments.get("days_back", 7),
                 size=arguments.get("size", 20),
+                detailed_transcript=detailed_transcript,
             )
-            return [TextContent(type="text", text=format_search_results(result))]
+            if detailed_transcript:
+                return [TextContent(type="text", text=await asyncio.to_thread(format_conversations, result.get("data", [])))]
+            return [TextContent(type="text", text=await asyncio.to_thread(format_search_results, result))]
 
         else:
             return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
-    except Exception as e:
+    except httpx.HTTPStatusError as e:
+        # Surface the status so callers can back off on 429/5xx
+        logger.warning(f"Attention API returned {e.response.status_code} for tool {name}")
+        return [TextContent(type="text", text=f"API error {e.response.status_code}: {e.response.text[:500]}")]
+    except httpx.RequestError as e:
+        logger.warning(f"Network error calling tool {name}: {e}")
+        return [TextContent(type="text", text=f"Network error: {e}")]
+    except KeyError as e:
+        return [TextContent(type="text", text=f"Error: missing required argument {e}")]
+    except ValueError as e:
+        # Missing API key or an undecodable response
         logger.exception(f"Error calling tool {name}")
-        return [TextContent(type="text", text=f"Error: {str(e)}")]
+        return [TextContent(type="text", text=f"Error: {e}")]
+
+
+_CONVERSATION_HEADER = (
+    "# {title}\n"
+    "\n"
+    "**ID:** {conv_id}\n"
+    "**Date:** {created}\n"
+    "**Video Status:** {video_status}\n"
+    "\n"
+    "## Participants"
+)
+
+
+def format_date(created: str) -> str:
+    """Format an ISO 8601 timestamp as "YYYY-MM-DD HH:MM" in its own offset."""
+    if not created:
+        return created
+
+    # Fast path for the API's fixed shape, e.g. "2024-01-02T15:04:05.000Z"
+    if len(created) >= 16 and created[4] == "-" and created[10] == "T" and created[13] == ":":
+        return f"{created[:10]} {created[11:16]}"
+
+    try:
+        dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
+        return dt.strftime("%Y-%m-%d %H:%M")
+    except (ValueError, TypeError):
+        return created
 
 
 def format_search_results(result: dict) -> str:
@@ -162,21 +261,15 @@ def format_search_results(result: dict) -> str:
     if not data:
         return "No conversations found."
 
-    lines = [f"Found {meta.get('totalRecords', len(data))} conversations:\n"]
+    buf = io.StringIO()
+    w = buf.write
+    w(f"Found {meta.get('totalRecords', len(data))} conversations:\n")
 
     for conv in data:
         attrs = conv.get("attributes", {})
         conv_id = conv.get("id", attrs.get("uuid", "unknown"))
         title = attrs.get("title", "Untitled")
-        created = attrs.get("createdAt", "")
-
-        # Format date
-        if created:
-            try:
-                dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
-                created = dt.strftime("%Y-%m-%d %H:%M")
-            except (ValueError, TypeError):
-                pass
+        created = format_date(attrs.get("createdAt", ""))
 
         # Get participants
         participants = attrs.get("participants", [])
@@ -185,17 +278,16 @@ def format_search_results(result: dict) -> str:
         if len(participants) > 3:
             participant_str += f" (+{len(participants) - 3} more)"
 
-        lines.append(f"- **{title}**")
-        lines.append(f"  ID: {conv_id}")
-        lines.append(f"  Date: {created}")
-        lines.append(f"  Participants: {participant_str}")
-        lines.append("")
+        w(f"\n- **{title}**")
+        w(f"\n  ID: {conv_id}")
+        w(f"\n  Date: {created}")
+        w(f"\n  Participants: {participant_str}\n")
 
     # Pagination info
     if meta.get("pageCount", 1) > 1:
-        lines.append(f"\nPage {meta.get('pageNumber', 1)} of {meta.get('pageCount')}")
+        w(f"\n\nPage {meta.get('pageNumber', 1)} of {meta.get('pageCount')}")
 
-    return "\n".join(lines)
+    return buf.getvalue()
 
 
 def format_conversation(result: dict) -> str:
@@ -209,139 +301,142 @@ def format_conversation(result: dict) -> str:
 
     conv_id = attrs.get("uuid", result.get("id", "unknown"))
     title = attrs.get("title", "Untitled")
-    created = attrs.get("createdAt", "")
-
-    # Format date
-    if created:
-        try:
-            dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
-            created = dt.strftime("%Y-%m-%d %H:%M")
-        except (ValueError, TypeError):
-            pass
+    created = format_date(attrs.get("createdAt", ""))
+
+    buf = io.StringIO()
+    w = buf.write
+    w(
+        _CONVERSATION_HEADER.format_map(
+            {
+                "title": title,
+                "conv_id": conv_id,
+                "created": created,
+                "video_status": attrs.get("videoStatus", "Unknown"),
+            }
+        )
+    )
 
     # Get participants
-    participants = attrs.get("participants", [])
-    participant_lines = []
-    for p in participants:
+    for p in attrs.get("participants", []):
         name = p.get("name") or p.get("email", "Unknown")
         email = p.get("email", "")
         if email and name != email:
-            participant_lines.append(f"  - {name} ({email})")
+            w(f"\n  - {name} ({email})")
         else:
-            participant_lines.append(f"  - {name}")
-
-    # Get transcript
-    transcript = attrs.get("transcript", {})
-    transcript_text = format_transcript(transcript)
+            w(f"\n  - {name}")
 
     # Get extracted intelligence (AI summaries)
     # Use confirmedExtractedIntelligence first, fall back to extractedIntelligence
     intelligence = attrs.get("confirmedExtractedIntelligence", {}) or attrs.get("extractedIntelligence", {})
-    intel_lines = []
-    if intelligence:
-        for key, item in intelligence.items():
-            if isinstance(item, dict):
-                intel_title = item.get("title", key)
-                intel_value = item.get("value", "")
-                if intel_value:
-                    intel_lines.append(f"### {intel_title}")
-                    intel_lines.append(intel_value)
-                    intel_lines.append("")
-            elif item:
-                intel_lines.append(f"  - {key}: {item}")
-
-    # Build output
-    lines = [
-        f"# {title}",
-        f"",
-        f"**ID:** {conv_id}",
-        f"**Date:** {created}",
-        f"**Video Status:** {attrs.get('videoStatus', 'Unknown')}",
-        f"",
-        f"## Participants",
-    ]
-    lines.extend(participant_lines)
-
-    if intel_lines:
-        lines.append("")
-        lines.append("## Extracted Intelligence")
-        lines.extend(intel_lines)
-
-    lines.append("")
-    lines.append("## Transcript")
-    lines.append("")
-    lines.append(transcript_text)
-
-    return "\n".join(lines)
+    wrote_intel_header = False
+    for key, item in (intelligence or {}).items():
+        if isinstance(item, dict):
+            intel_value = item.get("value", "")
+            if not intel_value:
+                continue
+            entry = f"\n### {item.get('title', key)}\n{intel_value}\n"
+        elif item:
+            entry = f"\n  - {key}: {item}"
+        else:
+            continue
+        if not wrote_intel_header:
+            w("\n\n## Extracted Intelligence")
+            wrote_intel_header = True
+        w(entry)
+
+    # Get transcript
+    w("\n\n## Transcript\n\n")
+    write_transcript(w, attrs.get("transcript", {}))
+
+    return buf.getvalue()
+
+
+def format_conversations(results: list[Union[dict, ConversationFetchError]]) -> str:
+    """Format several conversations, separated by horizontal rules. Failed fetches are noted in place."""
+    if not results:
+        return "No conversations found."
+
+    return "\n\n---\n\n".join(
+        f"# Conversation {result.conversation_id}\n\n*Could not fetch: {result.reason}*"
+        if isinstance(result, ConversationFetchError)
+        else format_conversation(result)
+        for result in results
+    )
 
 
 def format_transcript(transcript) -> str:
     """Format transcript data."""
+    buf = io.StringIO()
+    write_transcript(buf.write, transcript)
+    return buf.getvalue()
+
+
+def _segment_info(segment: dict) -> tuple[Optional[str], str]:
+    """Return the speaker name and combined text of a transcript segment."""
+    get = segment.get
+    speaker_info = get("speaker") or {}
+    speaker_name = speaker_info.get("name") or speaker_info.get("email", "Unknown")
+
+    # A list comprehension joins faster than a generator
+    return speaker_name, "".join([word["text"] for word in get("words", ()) if "text" in word]).strip()
+
+
+def write_transcript(w: Callable[[str], object], transcript) -> None:
+    """Format transcript data segment by segment through the writer w."""
     if not transcript:
-        return "*No transcript available*"
+        w("*No transcript available*")
+        return
 
     # Handle different transcript formats
     if isinstance(transcript, str):
-        return transcript
+        w(transcript)
+        return
 
     # Attention API returns a list of segments with speaker and words
     if isinstance(transcript, list):
-        lines = []
-        current_speaker = None
-        current_text = []
-
-        for segment in transcript:
-            speaker_info = segment.get("speaker", {})
-            speaker_name = speaker_info.get("name") or speaker_info.get("email", "Unknown")
-
-            # Combine words into text
-            words = segment.get("words", [])
-            segment_text = "".join(w.get("text", "") for w in words).strip()
+        segments = (info for info in map(_segment_info, transcript) if info[1])
+        separator = ""
 
-            if not segment_text:
+        # Group consecutive segments by speaker
+        for speaker, run in itertools.groupby(segments, key=itemgetter(0)):
+            # Segments without a speaker name can't be attributed
+            if not speaker:
                 continue
+            w(f"{separator}**{speaker}:** ")
+            w(" ".join([text for _, text in run]))
+            separator = "\n\n"
 
-            # Group consecutive segments by speaker
-            if speaker_name == current_speaker:
-                current_text.append(segment_text)
-            else:
-                # Output previous speaker's text
-                if current_speaker and current_text:
-                    lines.append(f"**{current_speaker}:** {' '.join(current_text)}")
-                current_speaker = speaker_name
-                current_text = [segment_text]
-
-        # Don't forget the last speaker
-        if current_speaker and current_text:
-            lines.append(f"**{current_speaker}:** {' '.join(current_text)}")
-
-        return "\n\n".join(lines) if lines else "*No transcript available*"
+        if not separator:
+            w("*No transcript available*")
+        return
 
     if isinstance(transcript, dict):
         # Check for common transcript formats
         if "text" in transcript:
-            return transcript["text"]
+            w(transcript["text"])
+            return
         if "segments" in transcript:
-            segments = transcript["segments"]
-            lines = []
-            for seg in segments:
-                speaker = seg.get("speaker", "Unknown")
-                text = seg.get("text", "")
-                lines.append(f"**{speaker}:** {text}")
-            return "\n\n".join(lines)
+            for i, seg in enumerate(transcript["segments"]):
+                if i:
+                    w("\n\n")
+                w(f"**{seg.get('speaker', 'Unknown')}:** {seg.get('text', '')}")
+            return
 
         # Fallback: pretty print the dict
-        return json.dumps(transcript, indent=2)
+        w(orjson.dumps(transcript, option=orjson.OPT_INDENT_2).decode())
+        return
 
-    return str(transcript)
+    w(str(transcript))
 
 
 async def main():
     """Run the MCP server."""
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(read_stream, write_stream, server.create_initialization_options())
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, server.create_initialization_options())
+    finally:
+        await close_client()
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())